@@ -1,15 +1,73 @@
-import folium
-import geopandas as gpd
+import time
+import uuid
+from pathlib import Path
+
 import pyarrow as pa
 import streamlit as st
-from folium.plugins import Draw
-from infra_hex_py.viz import create_hex_grid_map
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 
 import infra_hex_py
 
+# Map libraries (folium, geopandas, lonboard, ...) are imported in the branch that
+# renders with them, so the first paint doesn't wait on renderers it won't use.
+# Python caches imported modules, so reruns don't pay for them again.
+
+# With `streamlit run --server.enableStaticServing true` the hex layer is written
+# here and fetched by the browser instead of being embedded in the map HTML
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Sessions remove their layer file when they fetch again, but not when they end,
+# so new sessions also clear out files that haven't been written for this long.
+# A live session whose file is removed just writes it again on its next rerun.
+STALE_LAYER_SECONDS = 60 * 60
+
 st.set_page_config(page_title="Cadent Gas Asset Hex Map", layout="wide")
 
+
+# Fetches are cached as Arrow IPC bytes, which are cheap to pickle and read back,
+# so reruns and repeated areas skip the network round trip
+def to_ipc_bytes(batch: pa.RecordBatch) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def fetch_bbox(
+    min_lat: float, min_lon: float, max_lat: float, max_lon: float, zoom: int
+) -> bytes:
+    result = infra_hex_py.get_hex_summary(min_lat, min_lon, max_lat, max_lon, zoom)
+    return to_ipc_bytes(result)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def fetch_polygon(object_id: int, zoom: int) -> bytes:
+    result = infra_hex_py.get_hex_summary_polygon_area(object_id, zoom)
+    return to_ipc_bytes(result)
+
+
+def remove_stale_layers() -> None:
+    """Delete layer files left behind by sessions that have ended."""
+    cutoff = time.time() - STALE_LAYER_SECONDS
+    for layer_file in STATIC_DIR.glob("hex_*.geojson"):
+        try:
+            if layer_file.stat().st_mtime < cutoff:
+                layer_file.unlink()
+        except FileNotFoundError:
+            pass  # Removed by another session in the meantime
+
+
+def set_hex_table(table: pa.Table | None) -> None:
+    """Store new results, dropping the previous layer file and derived data."""
+    (STATIC_DIR / f"hex_{st.session_state.layer_id}.geojson").unlink(missing_ok=True)
+    st.session_state.hex_table = table
+    st.session_state.hex_gdf = None
+    # A new file name per fetch, so the layer file is written once per fetch
+    # rather than on every rerun and browsers never see a stale cached copy
+    st.session_state.layer_id = uuid.uuid4().hex
+
+
 st.title("Cadent Gas Asset Hex Map")
 
 method = st.radio(
@@ -18,6 +76,28 @@ method = st.radio(
     horizontal=True,
 )
 
+# deck.gl draws hexes from their H3 ids straight from the Arrow results, but
+# rectangles can only be drawn on the Folium map
+renderer = st.radio(
+    "Renderer",
+    ["Folium", "deck.gl (lonboard)"],
+    horizontal=True,
+    disabled=method == "Draw Rectangle",
+)
+if method == "Draw Rectangle":
+    renderer = "Folium"
+
+# Raw Arrow results, plus a WGS84 GeoDataFrame built only when Folium needs it
+if "hex_table" not in st.session_state:
+    st.session_state.hex_table = None
+
+if "hex_gdf" not in st.session_state:
+    st.session_state.hex_gdf = None
+
+if "layer_id" not in st.session_state:
+    st.session_state.layer_id = uuid.uuid4().hex
+    remove_stale_layers()
+
 col1, col2, col3 = st.columns([4, 3, 1])
 with col1:
     zoom = st.slider("Hex Zoom Level", min_value=8, max_value=15, value=11)
@@ -32,58 +112,44 @@ with col2:
 with col3:
     st.write("")
     if st.button("Clear", type="secondary"):
-        st.session_state.hex_gdf = None
+        set_hex_table(None)
         st.rerun()
 
-if "hex_gdf" not in st.session_state:
-    st.session_state.hex_gdf = None
-
 if method == "Built-Up Area (Object ID)":
     if st.button("Fetch Built-Up Area", type="primary"):
         with st.spinner(f"Fetching hex summary for built-up area {object_id}..."):
-            result = infra_hex_py.get_hex_summary_polygon_area(object_id, zoom)
-
-            table = pa.Table.from_batches([result])
-            gdf = gpd.GeoDataFrame.from_arrow(table)
-
-            gdf_wgs84 = gdf.to_crs(epsg=4326)
-            st.session_state.hex_gdf = gdf_wgs84
+            table = pa.ipc.open_stream(fetch_polygon(object_id, zoom)).read_all()
+            set_hex_table(table)
 
-            st.success(f"Found {len(gdf)} hexagons")
+            st.success(f"Found {table.num_rows} hexagons")
             st.rerun()
 else:
     st.write("Draw a rectangle on the map to fetch hex summary for that area")
 
-m = folium.Map(location=[53.48, -2.24], zoom_start=10, tiles="CartoDB positron")
+has_hexes = (
+    st.session_state.hex_table is not None and st.session_state.hex_table.num_rows > 0
+)
 
-if method == "Draw Rectangle":
-    Draw(
-        draw_options={
-            "polyline": False,
-            "polygon": False,
-            "circle": False,
-            "marker": False,
-            "circlemarker": False,
-            "rectangle": True,
-        },
-        edit_options={"edit": False},
-    ).add_to(m)
-
-if st.session_state.hex_gdf is not None and len(st.session_state.hex_gdf) > 0:
-    gdf = st.session_state.hex_gdf
-
-    m = create_hex_grid_map(
-        gdf,
-        value_column="pipe_count",
-        palette="grey_blue",
-        n_classes=5,
-        center=(53.48, -2.24),
-        zoom_start=10,
-        tooltip_fields=["hex_id", "pipe_count"],
-    )
+output = None
+if renderer == "deck.gl (lonboard)":
+    if has_hexes:
+        from infra_hex_py.viz import create_hex_grid_map_lonboard
+
+        deck_map = create_hex_grid_map_lonboard(
+            st.session_state.hex_table,
+            value_column="pipe_count",
+            palette="grey_blue",
+            class_column="class_idx",
+        )
+        components.html(deck_map.to_html(), height=800)
+    else:
+        st.info("Fetch a built-up area to show it on the deck.gl map")
+else:
+    import folium
+    from folium.plugins import Draw
+    from streamlit_folium import st_folium
 
-    folium.TileLayer("CartoDB positron", name="Light").add_to(m)
-    folium.LayerControl().add_to(m)
+    m = folium.Map(location=[53.48, -2.24], zoom_start=10, tiles="CartoDB positron")
 
     if method == "Draw Rectangle":
         Draw(
@@ -98,7 +164,38 @@ if st.session_state.hex_gdf is not None and len(st.session_state.hex_gdf) > 0:
             edit_options={"edit": False},
         ).add_to(m)
 
-output = st_folium(m, width=1200, height=800, use_container_width=True)
+    if has_hexes:
+        import geopandas as gpd
+        from infra_hex_py.viz import create_hex_grid_map
+
+        if st.session_state.hex_gdf is None:
+            gdf = gpd.GeoDataFrame.from_arrow(st.session_state.hex_table)
+            st.session_state.hex_gdf = gdf.to_crs(epsg=4326)
+        gdf = st.session_state.hex_gdf
+
+        layer_kwargs = {}
+        if st.get_option("server.enableStaticServing"):
+            STATIC_DIR.mkdir(exist_ok=True)
+            layer_file = f"hex_{st.session_state.layer_id}.geojson"
+            layer_kwargs = {
+                "geojson_path": STATIC_DIR / layer_file,
+                "geojson_url": f"/app/static/{layer_file}",
+                "overwrite_geojson": False,
+            }
+
+        create_hex_grid_map(
+            gdf,
+            value_column="pipe_count",
+            palette="grey_blue",
+            n_classes=5,
+            tooltip_fields=["hex_id", "pipe_count"],
+            m=m,
+            **layer_kwargs,
+        )
+
+        folium.LayerControl().add_to(m)
+
+    output = st_folium(m, width=1200, height=800, use_container_width=True)
 
 if method == "Draw Rectangle" and output and output.get("last_active_drawing"):
     drawing = output["last_active_drawing"]
@@ -114,14 +211,16 @@ if method == "Draw Rectangle" and output and output.get("last_active_drawing"):
         )
 
         with st.spinner("Fetching hex summary..."):
-            result = infra_hex_py.get_hex_summary(
-                min_lat, min_lon, max_lat, max_lon, zoom
+            # Rounded (~10m) so tiny differences in the drawn box reuse the cache
+            ipc_bytes = fetch_bbox(
+                round(min_lat, 4),
+                round(min_lon, 4),
+                round(max_lat, 4),
+                round(max_lon, 4),
+                zoom,
             )
-            table = pa.Table.from_batches([result])
-            gdf = gpd.GeoDataFrame.from_arrow(table)
-
-            gdf_wgs84 = gdf.to_crs(epsg=4326)
-            st.session_state.hex_gdf = gdf_wgs84
+            table = pa.ipc.open_stream(ipc_bytes).read_all()
+            set_hex_table(table)
 
-            st.success(f"Found {len(gdf)} hexagons")
+            st.success(f"Found {table.num_rows} hexagons")
             st.rerun()
@@ -6,8 +6,12 @@ def get_hex_summary(
     max_lat: float,
     max_lon: float,
     zoom: int,
+    breaks: list[float] | None = None,
+    n_classes: int = 5,
 ) -> pa.RecordBatch: ...
 def get_hex_summary_polygon_area(
     object_id: int,
     zoom: int,
+    breaks: list[float] | None = None,
+    n_classes: int = 5,
 ) -> pa.RecordBatch: ...
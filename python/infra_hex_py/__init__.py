@@ -1,12 +1,25 @@
 # Re-export from compiled Rust extension
 from infra_hex_py.infra_hex_py import get_hex_summary, get_hex_summary_polygon_area
 
-__all__ = ["get_hex_summary", "get_hex_summary_polygon_area"]
+__all__ = [
+    "get_hex_summary",
+    "get_hex_summary_polygon_area",
+    # Optional viz exports (require infra-hex-py[viz])
+    "jenks_breaks",
+    "quantile_breaks",
+    "create_hex_grid_map",
+    "create_hex_grid_map_datashader",
+    "create_hex_grid_map_lonboard",
+    "PALETTES",
+    "BREAK_METHODS",
+]
 
-# Optional viz exports (require infra-hex-py[viz])
-try:
-    from .viz import PALETTES, create_hex_grid_map, jenks_breaks  # noqa: F401
 
-    __all__.extend(["jenks_breaks", "create_hex_grid_map", "PALETTES"])
-except ImportError:
-    pass
+# Viz exports are imported on first access, since viz pulls in folium, lonboard,
+# datashader and numba when they are installed
+def __getattr__(name):
+    if name in __all__:
+        from . import viz
+
+        return getattr(viz, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
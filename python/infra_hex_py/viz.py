@@ -1,8 +1,15 @@
 """Visualisation helpers for infra-hex-py."""
 
-from typing import List, Optional
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 
 try:
     import branca.colormap as cm
@@ -15,7 +22,199 @@ except ImportError:
     HAS_VIZ_DEPS = False
 
 
-# TODO: Look into speeding this up - will be slow for larger grids
+# lonboard and datashader take most of this module's import time, so they are
+# only imported by the renderers that use them
+HAS_LONBOARD = importlib.util.find_spec("lonboard") is not None
+HAS_DATASHADER = importlib.util.find_spec("datashader") is not None
+
+
+try:
+    from numba import njit
+
+    HAS_NUMBA = True
+except ImportError:
+    njit = None
+    HAS_NUMBA = False
+
+
+# Both DP kernels below fill the tables one class at a time by divide and conquer.
+# The within-class variance cost satisfies the quadrangle inequality, so the
+# (earliest) optimal start of the last class never moves left as the end index
+# grows. Solving the middle end index first bounds the starts searched on either
+# side, giving O(k·n·log n) instead of O(k·n²) with the same breaks.
+#
+# DP tables (column j - 1 holds class j, so no column is left unused):
+# - `class_start_index[i, j - 1]` is the (1-based) start index of the j-th class when using first i values.
+# - `min_within_class_variance[i, j - 1]` is the minimum achievable within-class variance for that partition.
+
+
+def _jenks_dp_numpy(sorted_values: np.ndarray, n_classes: int) -> np.ndarray:
+    """Jenks DP vectorised over candidate starts, used when numba is not installed."""
+    n_values = len(sorted_values)
+
+    # Prefix sums for O(1) segment variances, centred to limit cancellation
+    centred = sorted_values - sorted_values[n_values // 2]
+    prefix_sum = np.concatenate(([0.0], np.cumsum(centred)))
+    prefix_sum_squares = np.concatenate(([0.0], np.cumsum(centred * centred)))
+
+    def segment_variance(segment_start, end_idx):
+        running_sum = prefix_sum[end_idx] - prefix_sum[segment_start - 1]
+        running_sum_squares = (
+            prefix_sum_squares[end_idx] - prefix_sum_squares[segment_start - 1]
+        )
+        segment_count = end_idx - segment_start + 1
+        return running_sum_squares - (running_sum * running_sum) / segment_count
+
+    class_start_index = np.zeros((n_values + 1, n_classes), dtype=np.int32)
+    min_within_class_variance = np.full((n_values + 1, n_classes), np.inf)
+
+    end_indices = np.arange(1, n_values + 1)
+    class_start_index[1:, 0] = 1
+    min_within_class_variance[1:, 0] = segment_variance(1, end_indices)
+
+    for class_idx in range(2, n_classes + 1):
+        # (end_lo, end_hi, start_lo, start_hi) ranges still to solve, 1-based
+        pending = [(class_idx, n_values, class_idx, n_values)]
+        while pending:
+            end_lo, end_hi, start_lo, start_hi = pending.pop()
+            end_idx = (end_lo + end_hi) // 2
+
+            segment_starts = np.arange(start_lo, min(start_hi, end_idx) + 1)
+            candidates = min_within_class_variance[
+                segment_starts - 1, class_idx - 2
+            ] + segment_variance(segment_starts, end_idx)
+            best = int(np.argmin(candidates))  # first minimum, i.e. earliest start
+            best_start = int(segment_starts[best])
+
+            class_start_index[end_idx, class_idx - 1] = best_start
+            min_within_class_variance[end_idx, class_idx - 1] = candidates[best]
+
+            if end_lo < end_idx:
+                pending.append((end_lo, end_idx - 1, start_lo, best_start))
+            if end_idx < end_hi:
+                pending.append((end_idx + 1, end_hi, best_start, start_hi))
+
+    return class_start_index
+
+
+if HAS_NUMBA:
+    assert njit is not None
+
+    @njit(cache=True)
+    def _jenks_dp(sorted_values: np.ndarray, n_classes: int) -> np.ndarray:
+        """Jenks DP compiled with numba, returns the `class_start_index` table."""
+        n_values = len(sorted_values)
+
+        centre = sorted_values[n_values // 2]
+        prefix_sum = np.zeros(n_values + 1, dtype=np.float64)
+        prefix_sum_squares = np.zeros(n_values + 1, dtype=np.float64)
+        for idx in range(n_values):
+            value = sorted_values[idx] - centre
+            prefix_sum[idx + 1] = prefix_sum[idx] + value
+            prefix_sum_squares[idx + 1] = prefix_sum_squares[idx] + value * value
+
+        class_start_index = np.zeros((n_values + 1, n_classes), dtype=np.int32)
+        min_within_class_variance = np.full(
+            (n_values + 1, n_classes), np.inf, dtype=np.float64
+        )
+
+        for end_idx in range(1, n_values + 1):
+            running_sum = prefix_sum[end_idx]
+            class_start_index[end_idx, 0] = 1
+            min_within_class_variance[end_idx, 0] = (
+                prefix_sum_squares[end_idx] - (running_sum * running_sum) / end_idx
+            )
+
+        # Pending ranges never overlap, so there are at most n_values of them
+        pending = np.empty((n_values + 1, 4), dtype=np.int64)
+        for class_idx in range(2, n_classes + 1):
+            pending[0, 0] = class_idx
+            pending[0, 1] = n_values
+            pending[0, 2] = class_idx
+            pending[0, 3] = n_values
+            n_pending = 1
+
+            while n_pending > 0:
+                n_pending -= 1
+                end_lo = pending[n_pending, 0]
+                end_hi = pending[n_pending, 1]
+                start_lo = pending[n_pending, 2]
+                start_hi = pending[n_pending, 3]
+                end_idx = (end_lo + end_hi) // 2
+
+                best_start = start_lo
+                best_variance = np.inf
+                for segment_start in range(start_lo, min(start_hi, end_idx) + 1):
+                    running_sum = prefix_sum[end_idx] - prefix_sum[segment_start - 1]
+                    running_sum_squares = (
+                        prefix_sum_squares[end_idx]
+                        - prefix_sum_squares[segment_start - 1]
+                    )
+                    segment_count = end_idx - segment_start + 1
+                    candidate = min_within_class_variance[
+                        segment_start - 1, class_idx - 2
+                    ] + (
+                        running_sum_squares
+                        - (running_sum * running_sum) / segment_count
+                    )
+                    if candidate < best_variance:
+                        best_variance = candidate
+                        best_start = segment_start
+
+                class_start_index[end_idx, class_idx - 1] = best_start
+                min_within_class_variance[end_idx, class_idx - 1] = best_variance
+
+                if end_lo < end_idx:
+                    pending[n_pending, 0] = end_lo
+                    pending[n_pending, 1] = end_idx - 1
+                    pending[n_pending, 2] = start_lo
+                    pending[n_pending, 3] = best_start
+                    n_pending += 1
+                if end_idx < end_hi:
+                    pending[n_pending, 0] = end_idx + 1
+                    pending[n_pending, 1] = end_hi
+                    pending[n_pending, 2] = best_start
+                    pending[n_pending, 3] = start_hi
+                    n_pending += 1
+
+        return class_start_index
+
+else:
+    _jenks_dp = _jenks_dp_numpy
+
+
+def _jenks_breaks_sorted(sorted_values: np.ndarray, n_classes: int) -> tuple:
+    """Jenks breaks for sorted values with more distinct values than classes."""
+    n_values = len(sorted_values)
+
+    class_start_index = _jenks_dp(sorted_values, n_classes)
+
+    # Backtracking visits breaks from max down to min, so duplicates are adjacent
+    # and can be skipped in place, then the order reversed
+    breaks = [sorted_values[-1]]
+    backtrack_end = n_values
+    for class_idx in range(n_classes, 1, -1):
+        start_idx = class_start_index[backtrack_end, class_idx - 1]  # 1-based
+        break_idx = start_idx - 1  # convert to 0-based
+        if sorted_values[break_idx] != breaks[-1]:
+            breaks.append(sorted_values[break_idx])
+        backtrack_end = start_idx - 1
+
+    if sorted_values[0] != breaks[-1]:
+        breaks.append(sorted_values[0])
+
+    return tuple(reversed(breaks))
+
+
+# Streamlit reruns the whole script on every interaction, usually with unchanged
+# data. Results are keyed by a digest of the sorted values, so the cache holds
+# only breaks and never whole value columns. Guarded by a lock since Streamlit
+# runs sessions in threads.
+_JENKS_CACHE_SIZE = 32
+_jenks_cache: "OrderedDict[Tuple[bytes, int], tuple]" = OrderedDict()
+_jenks_cache_lock = threading.Lock()
+
+
 def jenks_breaks(data, n_classes: int = 5) -> List[float]:
     """
     Calculate Jenks natural breaks for classification.
@@ -24,71 +223,81 @@ def jenks_breaks(data, n_classes: int = 5) -> List[float]:
     and maximising between-class variance.
 
     Args:
-        data: Array-like of numeric values
+        data: Array-like of numeric values (list, NumPy array, pandas Series or
+            Arrow array)
         n_classes: Number of classes/bins to create
 
     Returns:
         List of break points including min and max values
     """
-    sorted_values = np.array(sorted(data))
-    n_values = len(sorted_values)
+    sorted_values = np.ascontiguousarray(np.sort(np.asarray(data, dtype=np.float64)))
+
+    # With no more distinct values than classes every value starts its own class,
+    # which is what the DP would find; common for sparse or uniform grids.
+    # Counted from the sorted values rather than via np.unique, which sorts again.
+    n_distinct = np.count_nonzero(np.diff(sorted_values)) + 1
+    if n_distinct <= n_classes:
+        return np.unique(sorted_values).tolist()
+
+    key = (
+        hashlib.blake2b(sorted_values.tobytes(), digest_size=16).digest(),
+        n_classes,
+    )
+    with _jenks_cache_lock:
+        breaks = _jenks_cache.get(key)
+        if breaks is not None:
+            _jenks_cache.move_to_end(key)
 
-    if n_values <= n_classes:
-        return sorted_values.tolist()
-
-    # DP tables:
-    # - `class_start_index[i, j]` is the (1-based) start index of the j-th class when using first i values.
-    # - `min_within_class_variance[i, j]` is the minimum achievable within-class variance for that partition.
-    class_start_index = np.zeros((n_values + 1, n_classes + 1))
-    min_within_class_variance = np.full((n_values + 1, n_classes + 1), np.inf)
-    min_within_class_variance[1, 1] = 0
-
-    for end_idx in range(2, n_values + 1):
-        # Running totals for the segment [segment_start..end_idx] as we extend it backwards.
-        running_sum = 0.0
-        running_sum_squares = 0.0
-        segment_count = 0
-
-        for segment_len in range(1, end_idx + 1):
-            segment_start = (
-                end_idx - segment_len + 1
-            )  # 1-based start index for the segment
-            value = sorted_values[
-                segment_start - 1
-            ]  # convert to 0-based for array access
-
-            running_sum_squares += value * value
-            running_sum += value
-            segment_count += 1
-
-            segment_variance = (
-                running_sum_squares - (running_sum * running_sum) / segment_count
-            )
+    if breaks is None:
+        breaks = _jenks_breaks_sorted(sorted_values, n_classes)
+        with _jenks_cache_lock:
+            _jenks_cache[key] = breaks
+            if len(_jenks_cache) > _JENKS_CACHE_SIZE:
+                _jenks_cache.popitem(last=False)
 
-            if segment_start > 1:
-                for class_idx in range(2, n_classes + 1):
-                    candidate = (
-                        segment_variance
-                        + min_within_class_variance[segment_start - 1, class_idx - 1]
-                    )
-                    if min_within_class_variance[end_idx, class_idx] >= candidate:
-                        class_start_index[end_idx, class_idx] = segment_start
-                        min_within_class_variance[end_idx, class_idx] = candidate
+    return list(breaks)
 
-            class_start_index[end_idx, 1] = 1
-            min_within_class_variance[end_idx, 1] = segment_variance
 
-    breaks = [sorted_values[-1]]
-    backtrack_end = n_values
-    for class_idx in range(n_classes, 1, -1):
-        start_idx = int(class_start_index[backtrack_end, class_idx])  # 1-based
-        break_idx = start_idx - 1  # convert to 0-based
-        breaks.append(sorted_values[break_idx])
-        backtrack_end = start_idx - 1
+def quantile_breaks(data, n_classes: int = 5) -> List[float]:
+    """
+    Calculate quantile breaks for classification.
+
+    Splits the data into classes holding roughly equal numbers of values. Cheaper
+    than Jenks (a single sort) and often visually similar for dense grids.
+
+    Args:
+        data: Array-like of numeric values (list, NumPy array, pandas Series or
+            Arrow array)
+        n_classes: Number of classes/bins to create
+
+    Returns:
+        List of break points including min and max values
+    """
+    values = np.asarray(data, dtype=np.float64)
+    if len(values) == 0:
+        return []
+
+    return np.unique(np.quantile(values, np.linspace(0, 1, n_classes + 1))).tolist()
+
+
+BREAK_METHODS = {
+    "jenks": jenks_breaks,
+    "quantile": quantile_breaks,
+}
 
-    breaks.append(sorted_values[0])
 
-    return sorted(set(breaks))
+def _class_breaks(
+    values: np.ndarray, breaks_method: str, n_classes: int
+) -> List[float]:
+    """Breaks from the named `BREAK_METHODS` entry, rejecting unknown names."""
+    try:
+        break_method = BREAK_METHODS[breaks_method]
+    except KeyError:
+        raise ValueError(
+            f"Unknown breaks_method {breaks_method!r}, "
+            f"expected one of: {', '.join(BREAK_METHODS)}"
+        ) from None
+    return break_method(values, n_classes=n_classes)
 
 
 PALETTES = {
@@ -101,26 +310,131 @@ PALETTES = {
 }
 
 
+def _class_indices(
+    values: np.ndarray, breaks: List[float], n_colors: int
+) -> np.ndarray:
+    """Palette index for each value, matching `cm.StepColormap` colour lookups."""
+    indices = np.searchsorted(breaks, values, side="right") - 1
+    indices = np.clip(indices, 0, n_colors - 1)
+    indices[values >= breaks[-1]] = n_colors - 1
+    # Checked first by StepColormap, so with a single break (uniform values) the
+    # hexes get the first colour, not the last
+    indices[values <= breaks[0]] = 0
+    return indices.astype(np.uint8)
+
+
+def _palette_rgb(colors: List[str]) -> np.ndarray:
+    """Convert `#rrggbb` palette colours to an (n, 3) uint8 array."""
+    return np.array(
+        [[int(color[i : i + 2], 16) for i in (1, 3, 5)] for color in colors],
+        dtype=np.uint8,
+    )
+
+
+# Value of each ASCII hex digit by character code, 255 for other characters
+_HEX_DIGIT_VALUES = np.full(256, 255, dtype=np.uint8)
+_HEX_DIGIT_VALUES[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+_HEX_DIGIT_VALUES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+_HEX_DIGIT_VALUES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+
+def _h3_cell_ids(hex_ids) -> np.ndarray:
+    """H3 cell ids as uint64, parsing hex string ids if needed."""
+    if isinstance(hex_ids, pa.ChunkedArray):
+        hex_ids = hex_ids.combine_chunks()
+    elif not isinstance(hex_ids, pa.Array):
+        try:
+            hex_ids = pa.array(hex_ids)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"hex_id must hold H3 cell ids: {e}") from e
+
+    if hex_ids.null_count:
+        raise ValueError("hex_id must not contain nulls")
+
+    if pa.types.is_integer(hex_ids.type):
+        cell_ids = hex_ids.to_numpy().astype(np.uint64)
+    elif pa.types.is_string(hex_ids.type) or pa.types.is_large_string(hex_ids.type):
+        # Left pad to 16 digits so the ids are the rows of an (n, 16) byte array,
+        # then pack digit pairs into bytes and read each row as a big-endian uint64
+        padded = pc.utf8_lpad(hex_ids, width=16, padding="0").cast(pa.large_string())
+        offsets = np.frombuffer(padded.buffers()[1], dtype=np.int64)
+        offsets = offsets[padded.offset : padded.offset + len(padded) + 1]
+        is_hex = np.diff(offsets) == 16
+        if is_hex.all():
+            chars = np.frombuffer(padded.buffers()[2], dtype=np.uint8)
+            digits = _HEX_DIGIT_VALUES[chars[offsets[0] : offsets[-1]]].reshape(-1, 16)
+            is_hex = (digits < 16).all(axis=1)
+        if not is_hex.all():
+            bad_id = hex_ids[int(np.argmin(is_hex))].as_py()
+            raise ValueError(f"hex_id must hold H3 cell ids, got {bad_id!r}")
+
+        packed = (digits[:, 0::2] << 4) | digits[:, 1::2]
+        cell_ids = packed.view(">u8").ravel().astype(np.uint64)
+    else:
+        raise ValueError(f"hex_id must hold H3 cell ids, got {hex_ids.type} values")
+
+    # Cell ids have the high bit clear, index mode 1, no reserved bits set and
+    # one of the 122 base cells
+    is_cell = (
+        (cell_ids >> np.uint64(59) == 1)
+        & ((cell_ids >> np.uint64(56)) & np.uint64(0x7) == 0)
+        & ((cell_ids >> np.uint64(45)) & np.uint64(0x7F) < 122)
+    )
+    if not is_cell.all():
+        bad_id = hex_ids[int(np.argmin(is_cell))].as_py()
+        raise ValueError(f"hex_id must hold H3 cell ids, got {bad_id!r}")
+
+    return cell_ids
+
+
 def create_hex_grid_map(
     gdf,
     value_column: str = "pipe_count",
     palette: str = "grey_blue",
     n_classes: int = 5,
+    breaks_method: str = "jenks",
     center: Optional[tuple] = None,
     zoom_start: int = 10,
     tooltip_fields: Optional[List[str]] = None,
+    geojson_path: Optional[Union[str, Path]] = None,
+    geojson_url: Optional[str] = None,
+    coordinate_precision: Optional[int] = 6,
+    simplify_tolerance: Optional[float] = None,
+    m=None,
+    overwrite_geojson: bool = True,
 ):
     """
     Create a Folium hex grid map from a GeoDataFrame.
 
+    By default the hex layer is embedded in the map HTML. For large grids pass
+    `geojson_path` to write the layer to a GeoJSON file instead; the map then
+    fetches it in the browser, from `geojson_url` if the file is served under a
+    different URL (e.g. Streamlit static serving). With `overwrite_geojson=False`
+    an existing file is reused, skipping geometry processing and serialisation
+    when the same data is drawn again (e.g. on Streamlit reruns).
+
     Args:
         gdf: GeoDataFrame with geometry and value columns
         value_column: Column name to use for coloring
         palette: Color palette name (grey, blues, heat, greens, purples, grey_blue)
-        n_classes: Number of Jenks classes
-        center: Map center as (lat, lon), auto-calculated if None
-        zoom_start: Initial zoom level
+        n_classes: Number of classes
+        breaks_method: Class break method (jenks, quantile)
+        center: Map center as (lat, lon), auto-calculated if None. Ignored when m
+            is given
+        zoom_start: Initial zoom level. Ignored when m is given
         tooltip_fields: Fields to show in tooltip
+        geojson_path: File to write the hex layer to instead of embedding it
+        geojson_url: URL the browser loads `geojson_path` from, defaults to the path
+        coordinate_precision: Decimal places kept in lon/lat coordinates sent to the
+            browser, None to keep full precision
+        simplify_tolerance: Simplification tolerance in degrees, None or 0 to keep
+            the geometry as is. Keep it well below the hex edge length, since the
+            layer is drawn at every zoom level, not just `zoom_start`
+        m: Existing Folium Map to add the hex layer to, a new one is created if
+            None. The map keeps its own center and zoom
+        overwrite_geojson: Rewrite `geojson_path` if it already exists; pass False
+            to reuse it, in which case the path must change whenever the data or
+            styling does
 
     Returns:
         Folium Map object
@@ -134,15 +448,33 @@ def create_hex_grid_map(
     assert folium is not None
     assert cm is not None
 
+    reuse_geojson = (
+        geojson_path is not None
+        and not overwrite_geojson
+        and Path(geojson_path).exists()
+    )
+
     if gdf.crs and gdf.crs.to_epsg() != 4326:
         gdf = gdf.to_crs(epsg=4326)
 
-    if center is None:
-        bounds = gdf.total_bounds
-        center = ((bounds[1] + bounds[3]) / 2, (bounds[0] + bounds[2]) / 2)
+    if simplify_tolerance and not reuse_geojson:
+        # Topology preserving so hexes smaller than the tolerance are kept, not dropped
+        gdf = gdf.set_geometry(
+            gdf.geometry.simplify(simplify_tolerance, preserve_topology=True)
+        )
+
+    # Reprojected coordinates carry ~15 significant digits; 6 decimal places is ~0.1m
+    if coordinate_precision is not None and not reuse_geojson:
+        gdf = gdf.set_geometry(gdf.geometry.set_precision(10**-coordinate_precision))
+
+    if m is None:
+        # Empty frames have NaN bounds, leave folium's default location then
+        if center is None and len(gdf) > 0:
+            bounds = gdf.total_bounds
+            center = ((bounds[1] + bounds[3]) / 2, (bounds[0] + bounds[2]) / 2)
 
-    # Create map
-    m = folium.Map(location=center, zoom_start=zoom_start)
+        # Create map
+        m = folium.Map(location=center, zoom_start=zoom_start)
 
     if len(gdf) == 0:
         return m
@@ -152,7 +484,8 @@ def create_hex_grid_map(
 
     min_val = gdf[value_column].min()
     max_val = gdf[value_column].max()
-    breaks = jenks_breaks(gdf[value_column].values, n_classes=n_classes)
+    values = gdf[value_column].to_numpy(dtype=np.float64)
+    breaks = _class_breaks(values, breaks_method, n_classes)
 
     colormap = cm.StepColormap(
         colors=colors,
@@ -162,26 +495,57 @@ def create_hex_grid_map(
         caption=value_column.replace("_", " ").title(),
     )
 
-    def style_function(feature):
-        value = feature["properties"][value_column]
-        ratio = (value - min_val) / (max_val - min_val) if max_val > min_val else 0
-        opacity = 0.4 + (ratio * 0.5)
-        weight = 0.3 + (ratio * 1.2)
-        return {
-            "fillColor": colormap(value),
+    # Evaluate styles once per column rather than once per feature in style_function
+    if max_val > min_val:
+        ratio = (values - min_val) / (max_val - min_val)
+    else:
+        ratio = np.zeros_like(values)
+
+    # Same colours the colormap would pick, via one searchsorted over the column
+    class_idx = _class_indices(values, breaks, len(colors))
+
+    # Styles are looked up by feature id rather than stored as feature properties,
+    # so they aren't written into the GeoJSON. Rounding keeps the number of
+    # distinct styles, and so folium's style map, small.
+    if not gdf.index.is_unique:
+        gdf = gdf.reset_index(drop=True)
+    styles = {
+        str(feature_id): {
+            "fillColor": fill_color,
             "color": "#555",
             "weight": weight,
-            "fillOpacity": opacity,
+            "fillOpacity": fill_opacity,
         }
+        for feature_id, fill_color, fill_opacity, weight in zip(
+            gdf.index,
+            np.asarray(colors)[class_idx].tolist(),
+            np.round(0.4 + (ratio * 0.5), 2).tolist(),
+            np.round(0.3 + (ratio * 1.2), 2).tolist(),
+        )
+    }
+
+    def style_function(feature):
+        return styles[feature["id"]]
 
     if tooltip_fields is None:
         tooltip_fields = [value_column]
 
-    folium.GeoJson(
-        gdf,
+    if geojson_path is not None:
+        if not reuse_geojson:
+            Path(geojson_path).write_text(gdf.to_json())
+        data = str(geojson_path)
+    else:
+        data = gdf
+
+    hex_layer = folium.GeoJson(
+        data,
         style_function=style_function,
         tooltip=folium.GeoJsonTooltip(fields=tooltip_fields),
-    ).add_to(m)
+        embed=geojson_path is None,
+    )
+    if geojson_url is not None:
+        hex_layer.embed_link = geojson_url
+    hex_layer.add_to(m)
 
     colormap.add_to(m)
 
@@ -189,3 +553,182 @@ def create_hex_grid_map(
     m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
 
     return m
+
+
+def create_hex_grid_map_datashader(
+    gdf,
+    value_column: str = "pipe_count",
+    palette: str = "grey_blue",
+    n_classes: int = 5,
+    breaks_method: str = "jenks",
+    center: Optional[tuple] = None,
+    zoom_start: int = 10,
+    plot_width: int = 1200,
+    opacity: float = 0.7,
+    m=None,
+):
+    """
+    Create a Folium hex grid map with the hexes rendered as a Datashader raster.
+
+    The hexes are rasterised once in Python and added as a single PNG
+    `ImageOverlay`, so the browser draws one image instead of laying out a
+    GeoJSON feature per hex. Suited to grids too large for `create_hex_grid_map`,
+    at the cost of tooltips and of sharp edges when zoomed in past the raster
+    resolution.
+
+    Args:
+        gdf: GeoDataFrame with geometry and value columns
+        value_column: Column name to use for coloring
+        palette: Color palette name (grey, blues, heat, greens, purples, grey_blue)
+        n_classes: Number of classes
+        breaks_method: Class break method (jenks, quantile)
+        center: Map center as (lat, lon), auto-calculated if None. Ignored when m
+            is given
+        zoom_start: Initial zoom level. Ignored when m is given
+        plot_width: Raster width in pixels, the height follows the aspect ratio
+        opacity: Opacity of the raster overlay
+        m: Existing Folium Map to add the hex layer to, a new one is created if
+            None. The map keeps its own center and zoom
+
+    Returns:
+        Folium Map object
+    """
+    if not HAS_VIZ_DEPS or not HAS_DATASHADER:
+        raise ImportError(
+            "Visualisation dependencies not installed. "
+            "Install with: pip install infra-hex-py[viz]"
+        )
+
+    assert folium is not None
+    assert cm is not None
+
+    import datashader as ds
+    import datashader.transfer_functions as tf
+
+    if gdf.crs and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+
+    bounds = gdf.total_bounds
+
+    if m is None:
+        # Empty frames have NaN bounds, leave folium's default location then
+        if center is None and len(gdf) > 0:
+            center = ((bounds[1] + bounds[3]) / 2, (bounds[0] + bounds[2]) / 2)
+
+        m = folium.Map(location=center, zoom_start=zoom_start)
+
+    if len(gdf) == 0:
+        return m
+
+    colors = PALETTES.get(palette, PALETTES["grey_blue"])
+
+    values = gdf[value_column].to_numpy(dtype=np.float64)
+    breaks = _class_breaks(values, breaks_method, n_classes)
+
+    colormap = cm.StepColormap(
+        colors=colors,
+        index=breaks,
+        vmin=values.min(),
+        vmax=values.max(),
+        caption=value_column.replace("_", " ").title(),
+    )
+
+    # Rasterise class indices rather than raw values so pixels get the same step
+    # colours as the legend. Hexes don't overlap, so max is just the hex's class.
+    class_idx = _class_indices(values, breaks, len(colors)).astype(np.float64)
+
+    # Leaflet stretches overlays linearly in Web Mercator, so rasterise there too
+    mercator = gdf[[gdf.geometry.name]].assign(_class_idx=class_idx).to_crs(epsg=3857)
+    x_min, y_min, x_max, y_max = mercator.total_bounds
+    plot_height = max(1, round(plot_width * (y_max - y_min) / max(x_max - x_min, 1)))
+
+    canvas = ds.Canvas(
+        plot_width=plot_width,
+        plot_height=plot_height,
+        x_range=(x_min, x_max),
+        y_range=(y_min, y_max),
+    )
+    agg = canvas.polygons(
+        mercator, geometry=mercator.geometry.name, agg=ds.max("_class_idx")
+    )
+    image = tf.shade(agg, cmap=colors, how="linear", span=(0, len(colors) - 1))
+
+    # Packed uint32 RGBA to an (h, w, 4) array, with the first row at the bottom
+    rgba = image.data.view(np.uint8).reshape(*image.shape, 4)
+
+    folium.raster_layers.ImageOverlay(
+        rgba,
+        bounds=[[bounds[1], bounds[0]], [bounds[3], bounds[2]]],
+        origin="lower",
+        opacity=opacity,
+        name=value_column.replace("_", " ").title(),
+    ).add_to(m)
+
+    colormap.add_to(m)
+
+    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
+
+    return m
+
+
+def create_hex_grid_map_lonboard(
+    data,
+    value_column: str = "pipe_count",
+    palette: str = "grey_blue",
+    n_classes: int = 5,
+    breaks_method: str = "jenks",
+    class_column: Optional[str] = None,
+):
+    """
+    Create a lonboard (deck.gl) hex grid map from hex summary results.
+
+    Hexagons are drawn from their H3 `hex_id` by deck.gl, so only the ids and
+    a colour per hex are sent to the browser rather than polygon geometry.
+    Suited to grids too large for `create_hex_grid_map`. Since geometry is not
+    used, the Arrow output of `get_hex_summary` can be passed in directly
+    without building a GeoDataFrame or reprojecting it.
+
+    Args:
+        data: Arrow RecordBatch/Table or (Geo)DataFrame with `hex_id` and value
+            columns
+        value_column: Column name to use for coloring
+        palette: Color palette name (grey, blues, heat, greens, purples, grey_blue)
+        n_classes: Number of classes
+        breaks_method: Class break method (jenks, quantile)
+        class_column: Column of precomputed class indices (e.g. the `class_idx`
+            column from `get_hex_summary`); when set, breaks are not computed
+            and `n_classes`/`breaks_method` are ignored
+
+    Returns:
+        lonboard Map object
+    """
+    if not HAS_LONBOARD:
+        raise ImportError(
+            "lonboard is not installed. Install with: pip install infra-hex-py[viz]"
+        )
+
+    import lonboard
+
+    if len(data) == 0:
+        return lonboard.Map(layers=[])
+
+    colors = PALETTES.get(palette, PALETTES["grey_blue"])
+
+    # Works on pandas and Arrow columns alike, so Arrow input never goes via pandas
+    values = np.asarray(data[value_column], dtype=np.float64)
+    hex_ids = _h3_cell_ids(data["hex_id"])
+
+    if class_column is not None:
+        class_idx = np.clip(np.asarray(data[class_column]), 0, len(colors) - 1)
+    else:
+        breaks = _class_breaks(values, breaks_method, n_classes)
+        class_idx = _class_indices(values, breaks, len(colors))
+
+    layer = lonboard.H3HexagonLayer(
+        table=pa.table({"hex_id": hex_ids, value_column: values}),
+        get_hexagon=hex_ids,
+        get_fill_color=_palette_rgb(colors)[class_idx],
+        opacity=0.7,
+    )
+
+    return lonboard.Map(layers=[layer])
@@ -0,0 +1,232 @@
+use std::sync::Arc;
+
+use arrow_array::{ArrayRef, Int8Array, RecordBatch, cast::AsArray, types::Float64Type};
+use arrow_cast::cast::cast;
+use arrow_schema::{ArrowError, DataType, Field, FieldRef, Schema};
+
+/// Append a `class_idx` (Int8) column classifying `pipe_count`.
+///
+/// Uses `breaks` if given, otherwise Jenks natural breaks with `n_classes`
+/// classes, matching `infra_hex_py.viz.jenks_breaks`. Indices follow
+/// `infra_hex_py.viz._class_indices` with `n_classes` colours, so they can index
+/// the same palette as the Folium legend.
+pub fn with_class_idx(
+    batch: RecordBatch,
+    breaks: Option<Vec<f64>>,
+    n_classes: usize,
+) -> Result<RecordBatch, ArrowError> {
+    let schema = batch.schema();
+
+    let pipe_count = batch
+        .column_by_name("pipe_count")
+        .ok_or_else(|| ArrowError::SchemaError("Missing pipe_count column".to_string()))?;
+    let pipe_count = cast(pipe_count, &DataType::Float64)?;
+    let values: &[f64] = pipe_count.as_primitive::<Float64Type>().values();
+
+    let breaks = breaks.unwrap_or_else(|| jenks_breaks(values, n_classes));
+    let class_idx: ArrayRef = Arc::new(Int8Array::from(class_indices(values, &breaks, n_classes)));
+
+    let mut fields: Vec<FieldRef> = schema.fields().iter().cloned().collect();
+    fields.push(Arc::new(Field::new("class_idx", DataType::Int8, false)));
+
+    let mut columns = batch.columns().to_vec();
+    columns.push(class_idx);
+
+    RecordBatch::try_new(
+        Arc::new(Schema::new_with_metadata(fields, schema.metadata().clone())),
+        columns,
+    )
+}
+
+/// Class of each value, matching `cm.StepColormap` colour lookups: the number of
+/// breaks at or below it less one, clamped to `n_classes - 1`. As in
+/// `StepColormap`, values at or below the first break are checked first and get
+/// the first class, then values at or above the last break get the last class.
+fn class_indices(values: &[f64], breaks: &[f64], n_classes: usize) -> Vec<i8> {
+    let last_class = n_classes.saturating_sub(1).min(i8::MAX as usize);
+    values
+        .iter()
+        .map(|value| {
+            if breaks.first().is_some_and(|first| value <= first) {
+                return 0;
+            }
+            if breaks.last().is_some_and(|last| value >= last) {
+                return last_class as i8;
+            }
+            let n_below = breaks.partition_point(|b| b <= value);
+            n_below.saturating_sub(1).min(last_class) as i8
+        })
+        .collect()
+}
+
+/// Jenks natural breaks, a port of `infra_hex_py.viz.jenks_breaks`.
+///
+/// Each class is solved by divide and conquer over end indices, relying on the
+/// optimal start of the last class being monotone in the end index.
+fn jenks_breaks(values: &[f64], n_classes: usize) -> Vec<f64> {
+    let mut sorted_values = values.to_vec();
+    sorted_values.sort_by(|a, b| a.total_cmp(b));
+
+    let mut unique_values = sorted_values.clone();
+    unique_values.dedup();
+    if unique_values.len() <= n_classes {
+        return unique_values;
+    }
+
+    let n_values = sorted_values.len();
+
+    // Prefix sums for O(1) segment variances, centred to limit cancellation
+    let centre = sorted_values[n_values / 2];
+    let mut prefix_sum = vec![0.0; n_values + 1];
+    let mut prefix_sum_squares = vec![0.0; n_values + 1];
+    for (idx, value) in sorted_values.iter().enumerate() {
+        let value = value - centre;
+        prefix_sum[idx + 1] = prefix_sum[idx] + value;
+        prefix_sum_squares[idx + 1] = prefix_sum_squares[idx] + value * value;
+    }
+
+    // 1-based, inclusive segment
+    let segment_variance = |segment_start: usize, end_idx: usize| {
+        let running_sum = prefix_sum[end_idx] - prefix_sum[segment_start - 1];
+        let running_sum_squares =
+            prefix_sum_squares[end_idx] - prefix_sum_squares[segment_start - 1];
+        let segment_count = (end_idx - segment_start + 1) as f64;
+        running_sum_squares - (running_sum * running_sum) / segment_count
+    };
+
+    // `class_start_index[j - 1][i]` is the (1-based) start of class j using the first i values
+    let mut class_start_index = vec![vec![1usize; n_values + 1]; n_classes];
+    let mut min_within_class_variance: Vec<f64> = (0..=n_values)
+        .map(|end_idx| {
+            if end_idx == 0 {
+                f64::INFINITY
+            } else {
+                segment_variance(1, end_idx)
+            }
+        })
+        .collect();
+
+    for class_idx in 2..=n_classes {
+        let mut next_variance = vec![f64::INFINITY; n_values + 1];
+        let mut pending = vec![(class_idx, n_values, class_idx, n_values)];
+
+        while let Some((end_lo, end_hi, start_lo, start_hi)) = pending.pop() {
+            let end_idx = (end_lo + end_hi) / 2;
+
+            let mut best_start = start_lo;
+            let mut best_variance = f64::INFINITY;
+            for segment_start in start_lo..=start_hi.min(end_idx) {
+                let candidate = min_within_class_variance[segment_start - 1]
+                    + segment_variance(segment_start, end_idx);
+                if candidate < best_variance {
+                    best_variance = candidate;
+                    best_start = segment_start;
+                }
+            }
+
+            next_variance[end_idx] = best_variance;
+            class_start_index[class_idx - 1][end_idx] = best_start;
+
+            if end_lo < end_idx {
+                pending.push((end_lo, end_idx - 1, start_lo, best_start));
+            }
+            if end_idx < end_hi {
+                pending.push((end_idx + 1, end_hi, best_start, start_hi));
+            }
+        }
+
+        min_within_class_variance = next_variance;
+    }
+
+    let mut breaks = vec![sorted_values[n_values - 1]];
+    let mut backtrack_end = n_values;
+    for class_idx in (2..=n_classes).rev() {
+        let start_idx = class_start_index[class_idx - 1][backtrack_end];
+        breaks.push(sorted_values[start_idx - 1]);
+        backtrack_end = start_idx - 1;
+    }
+    breaks.push(sorted_values[0]);
+
+    breaks.sort_by(|a, b| a.total_cmp(b));
+    breaks.dedup();
+    breaks
+}
+
+#[cfg(test)]
+mod tests {
+    use arrow_array::Int64Array;
+
+    use super::*;
+
+    // Expected breaks come from `infra_hex_py.viz.jenks_breaks` on the same values
+
+    #[test]
+    fn jenks_breaks_clustered_values() {
+        let values = [1.0, 2.0, 3.0, 20.0, 21.0, 22.0, 50.0, 51.0, 52.0];
+        assert_eq!(jenks_breaks(&values, 3), vec![1.0, 20.0, 50.0, 52.0]);
+    }
+
+    #[test]
+    fn jenks_breaks_few_distinct_values() {
+        let values = [3.0, 1.0, 9.0, 3.0, 1.0];
+        assert_eq!(jenks_breaks(&values, 5), vec![1.0, 3.0, 9.0]);
+    }
+
+    #[test]
+    fn jenks_breaks_match_python() {
+        let values: Vec<f64> = (0..200u64)
+            .map(|i| ((i * i * 7919) % 1000) as f64)
+            .collect();
+        assert_eq!(
+            jenks_breaks(&values, 5),
+            vec![0.0, 231.0, 456.0, 656.0, 856.0, 999.0]
+        );
+
+        let values: Vec<f64> = (0..120u64)
+            .map(|i| ((i * 37) % 23 + (i % 7) * 10) as f64)
+            .collect();
+        assert_eq!(jenks_breaks(&values, 4), vec![0.0, 24.0, 44.0, 62.0, 82.0]);
+    }
+
+    #[test]
+    fn class_indices_match_python() {
+        let values = [0.0, 1.0, 19.0, 20.0, 51.0, 52.0, 60.0];
+        assert_eq!(
+            class_indices(&values, &[1.0, 20.0, 50.0, 52.0], 5),
+            vec![0, 0, 0, 1, 2, 4, 4]
+        );
+    }
+
+    #[test]
+    fn class_indices_few_breaks_use_last_class() {
+        // The maximum gets the last class even when there are fewer breaks than
+        // classes, matching `viz._class_indices`
+        assert_eq!(
+            class_indices(&[1.0, 2.0, 3.0], &[1.0, 2.0, 3.0], 5),
+            vec![0, 1, 4]
+        );
+    }
+
+    #[test]
+    fn class_indices_uniform_values_use_first_class() {
+        // A single break is both first and last; the first class wins, matching
+        // `viz._class_indices` and the legend
+        let values = [7.0; 4];
+        assert_eq!(jenks_breaks(&values, 5), vec![7.0]);
+        assert_eq!(class_indices(&values, &[7.0], 5), vec![0, 0, 0, 0]);
+    }
+
+    #[test]
+    fn with_class_idx_appends_column() {
+        let pipe_count: ArrayRef = Arc::new(Int64Array::from(vec![52, 21, 20, 3, 2, 1]));
+        let batch = RecordBatch::try_from_iter([("pipe_count", pipe_count)]).unwrap();
+
+        let batch = with_class_idx(batch, Some(vec![1.0, 20.0, 50.0, 52.0]), 5).unwrap();
+
+        let class_idx = batch
+            .column_by_name("class_idx")
+            .unwrap()
+            .as_primitive::<arrow_array::types::Int8Type>();
+        assert_eq!(class_idx.values().to_vec(), vec![4, 1, 1, 0, 0, 0]);
+    }
+}
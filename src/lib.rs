@@ -6,7 +6,11 @@ use infra_hex_rs::{
 use pyo3::prelude::*;
 use pyo3_arrow::PyRecordBatch;
 
+mod classify;
+
 #[pyfunction]
+#[pyo3(signature = (min_lat, min_lon, max_lat, max_lon, zoom, breaks=None, n_classes=5))]
+#[allow(clippy::too_many_arguments)]
 fn get_hex_summary(
     py: Python<'_>,
     min_lat: f64,
@@ -14,6 +18,8 @@ fn get_hex_summary(
     max_lat: f64,
     max_lon: f64,
     zoom: u8,
+    breaks: Option<Vec<f64>>,
+    n_classes: usize,
 ) -> PyResult<Py<PyAny>> {
     let runtime = tokio::runtime::Runtime::new()
         .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
@@ -36,6 +42,9 @@ fn get_hex_summary(
     let batch = to_hex_summary(&result.records, zoom)
         .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
+    let batch = classify::with_class_idx(batch, breaks, n_classes)
+        .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
+
     PyRecordBatch::new(batch)
         .into_pyarrow(py)
         .map(|bound| bound.unbind())
@@ -47,11 +56,20 @@ fn get_hex_summary(
 /// # Arguments
 /// * `object_id` - The OBJECTID of the built-up area from ONS Open Geography Portal
 /// * `zoom` - Hex grid zoom level (0-15)
+/// * `breaks` - Class breaks for `class_idx`, Jenks natural breaks if None
+/// * `n_classes` - Number of Jenks classes when `breaks` is None
 ///
 /// # Returns
-/// A PyArrow RecordBatch with columns: hex_id, pipe_count, geometry
+/// A PyArrow RecordBatch with columns: hex_id, pipe_count, geometry, class_idx
 #[pyfunction]
-fn get_hex_summary_polygon_area(py: Python<'_>, object_id: i64, zoom: u8) -> PyResult<Py<PyAny>> {
+#[pyo3(signature = (object_id, zoom, breaks=None, n_classes=5))]
+fn get_hex_summary_polygon_area(
+    py: Python<'_>,
+    object_id: i64,
+    zoom: u8,
+    breaks: Option<Vec<f64>>,
+    n_classes: usize,
+) -> PyResult<Py<PyAny>> {
     let runtime = tokio::runtime::Runtime::new()
         .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
@@ -83,6 +101,9 @@ fn get_hex_summary_polygon_area(py: Python<'_>, object_id: i64, zoom: u8) -> PyR
     let batch = to_hex_summary_for_multipolygon(&result.records, zoom, &built_up_area.geometry)
         .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
+    let batch = classify::with_class_idx(batch, breaks, n_classes)
+        .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
+
     PyRecordBatch::new(batch)
         .into_pyarrow(py)
         .map(|bound| bound.unbind())
@@ -1,11 +1,12 @@
 import geopandas as gpd
 import pyarrow as pa
 import pytest
+from infra_hex_py.viz import _class_indices, jenks_breaks
 
 import infra_hex_py
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def test_bbox():
     """Test bounding box."""
     return {
@@ -17,7 +18,7 @@ def test_bbox():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def hex_summary_result(test_bbox):
     """Get hex summary for test bounding box."""
     result = infra_hex_py.get_hex_summary(
@@ -28,7 +29,6 @@ def hex_summary_result(test_bbox):
         test_bbox["zoom"],
     )
     table = pa.Table.from_batches([result])
-    print(table.slice(0, 5))
     return gpd.GeoDataFrame.from_arrow(table)
 
 
@@ -39,7 +39,7 @@ def test_hex_summary_returns_geodataframe(hex_summary_result):
 
 def test_hex_summary_has_expected_columns(hex_summary_result):
     """Test that the GeoDataFrame has the expected columns."""
-    expected_columns = {"hex_id", "pipe_count", "geometry"}
+    expected_columns = {"hex_id", "pipe_count", "class_idx", "geometry"}
     assert set(hex_summary_result.columns) == expected_columns
 
 
@@ -71,6 +71,35 @@ def test_hex_summary_pipe_counts_are_positive(hex_summary_result):
     )
 
 
+def test_hex_summary_class_idx_in_range(hex_summary_result):
+    """Test that class indices fall within the default five classes."""
+    class_idx = hex_summary_result["class_idx"]
+    assert class_idx.between(0, 4).all(), "Class indices should be in [0, 4]"
+
+
+def test_hex_summary_class_idx_matches_viz(hex_summary_result):
+    """Test that class_idx matches the Folium map's Jenks classes."""
+    values = hex_summary_result["pipe_count"].to_numpy(dtype="float64")
+    expected = _class_indices(values, jenks_breaks(values), 5)
+    assert (hex_summary_result["class_idx"].to_numpy() == expected).all()
+
+
+@pytest.mark.parametrize("breaks", [[1.0, 2.0, 3.0], [1.0]])
+def test_hex_summary_class_idx_with_few_breaks(test_bbox, breaks):
+    """Test that class_idx matches viz with fewer breaks than classes."""
+    result = infra_hex_py.get_hex_summary(
+        test_bbox["min_lat"],
+        test_bbox["min_lon"],
+        test_bbox["max_lat"],
+        test_bbox["max_lon"],
+        test_bbox["zoom"],
+        breaks=breaks,
+    )
+    values = result.column("pipe_count").to_numpy().astype("float64")
+    expected = _class_indices(values, breaks, 5)
+    assert (result.column("class_idx").to_numpy() == expected).all()
+
+
 def test_hex_summary_hex_ids_are_unique(hex_summary_result):
     """Test that hex IDs are unique."""
     assert hex_summary_result["hex_id"].is_unique, "Hex IDs should be unique"
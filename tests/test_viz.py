@@ -0,0 +1,392 @@
+import base64
+import json
+import os
+import struct
+import zlib
+
+import branca.colormap as cm
+import folium
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from infra_hex_py.viz import (
+    PALETTES,
+    _class_indices,
+    _h3_cell_ids,
+    _jenks_cache,
+    _palette_rgb,
+    create_hex_grid_map,
+    create_hex_grid_map_datashader,
+    create_hex_grid_map_lonboard,
+    jenks_breaks,
+    quantile_breaks,
+)
+from shapely.geometry import Polygon
+
+
+def _hexagon(x: float, y: float, edge: float) -> Polygon:
+    angles = np.deg2rad(np.arange(0, 360, 60))
+    return Polygon(zip(x + edge * np.cos(angles), y + edge * np.sin(angles)))
+
+
+@pytest.fixture
+def hex_gdf():
+    """Grid of hexagons the size of H3 resolution 10 cells in British National Grid."""
+    edge = 76.0
+    centres = [
+        (383000 + col * 1.5 * edge, 398000 + (row + (col % 2) / 2) * np.sqrt(3) * edge)
+        for col in range(10)
+        for row in range(8)
+    ]
+    return gpd.GeoDataFrame(
+        {
+            "hex_id": [f"hex{i}" for i in range(len(centres))],
+            "pipe_count": np.arange(1, len(centres) + 1),
+        },
+        geometry=[_hexagon(x, y, edge) for x, y in centres],
+        crs=27700,
+    )
+
+
+# H3 resolution 10 cells in central Manchester
+H3_CELLS = ["8a1951b7550ffff", "8a1951b75427fff", "8a1951b75507fff", "8a1951b7551ffff"]
+
+
+@pytest.fixture
+def clustered_values():
+    """Three well separated clusters of values."""
+    return [1, 2, 2, 3, 20, 21, 22, 23, 50, 51, 52]
+
+
+def test_jenks_breaks_finds_natural_groups(clustered_values):
+    """Test that each cluster starts its own class."""
+    assert jenks_breaks(clustered_values, n_classes=3) == [1, 20, 50, 52]
+
+
+def test_jenks_breaks_includes_min_and_max():
+    """Test that the first and last breaks are the data min and max."""
+    values = np.random.default_rng(42).exponential(10, 200)
+    breaks = jenks_breaks(values, n_classes=5)
+    assert breaks[0] == values.min()
+    assert breaks[-1] == values.max()
+
+
+def test_jenks_breaks_are_sorted():
+    """Test that breaks are returned in ascending order."""
+    values = np.random.default_rng(42).integers(1, 100, 150)
+    breaks = jenks_breaks(values, n_classes=5)
+    assert breaks == sorted(breaks)
+
+
+def test_jenks_breaks_fewer_values_than_classes():
+    """Test that small inputs return the sorted values unchanged."""
+    assert jenks_breaks([3, 1, 2], n_classes=5) == [1, 2, 3]
+
+
+def test_jenks_breaks_uniform_values():
+    """Test that uniform data collapses to a single break."""
+    assert jenks_breaks([7] * 50, n_classes=5) == [7]
+
+
+def test_jenks_breaks_few_distinct_values():
+    """Test that data with fewer distinct values than classes returns them."""
+    values = [1, 1, 3, 3, 3, 9, 9, 9, 9, 9]
+    assert jenks_breaks(values, n_classes=5) == [1, 3, 9]
+
+
+def test_jenks_breaks_accepts_pandas_series(clustered_values):
+    """Test that a pandas Series gives the same breaks as a list."""
+    series = pd.Series(clustered_values)
+    assert jenks_breaks(series, n_classes=3) == jenks_breaks(
+        clustered_values, n_classes=3
+    )
+
+
+def test_jenks_breaks_cached_result_is_not_shared(clustered_values):
+    """Test that mutating returned breaks does not affect later calls."""
+    breaks = jenks_breaks(clustered_values, n_classes=3)
+    breaks.append(999)
+    assert jenks_breaks(clustered_values, n_classes=3) == [1, 20, 50, 52]
+
+
+def test_jenks_breaks_cache_does_not_hold_values(clustered_values):
+    """Test that the breaks cache is keyed on a digest, not the value array."""
+    jenks_breaks(clustered_values, n_classes=3)
+    for (digest, n_classes), breaks in _jenks_cache.items():
+        assert isinstance(digest, bytes) and len(digest) == 16
+        assert isinstance(breaks, tuple)
+
+
+def test_jenks_breaks_large_input_is_optimal():
+    """Test breaks on a larger input match an exhaustive two-class split."""
+    values = np.sort(np.random.default_rng(42).exponential(10, 2000))
+    split_costs = [
+        values[:i].var() * i + values[i:].var() * (len(values) - i)
+        for i in range(1, len(values))
+    ]
+    best_split = int(np.argmin(split_costs)) + 1
+    assert jenks_breaks(values, n_classes=2) == [
+        values[0],
+        values[best_split],
+        values[-1],
+    ]
+
+
+def test_quantile_breaks_split_evenly():
+    """Test that quantile breaks give classes of equal size."""
+    assert quantile_breaks(np.arange(101), n_classes=4) == [0, 25, 50, 75, 100]
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        np.random.default_rng(42).integers(1, 100, 300).astype(float),
+        np.array([1.0, 1.0, 2.0, 3.0, 3.0]),
+        np.full(20, 7.0),
+    ],
+    ids=["random", "few_distinct", "uniform"],
+)
+def test_class_indices_match_step_colormap(values):
+    """Test that precomputed class indices pick the same colours as branca."""
+    colors = PALETTES["heat"]
+    breaks = jenks_breaks(values, n_classes=5)
+    colormap = cm.StepColormap(
+        colors=colors, index=breaks, vmin=values.min(), vmax=values.max()
+    )
+
+    class_idx = _class_indices(values, breaks, len(colors))
+
+    assert [colors[i] for i in class_idx] == [colormap(value)[:7] for value in values]
+
+
+def test_create_hex_grid_map_keeps_hex_shape(hex_gdf, tmp_path):
+    """Test that the default settings don't simplify hexes sent to the browser."""
+    geojson_path = tmp_path / "hex.geojson"
+    create_hex_grid_map(hex_gdf, geojson_path=geojson_path)
+
+    layer = gpd.read_file(geojson_path)
+    assert (layer.count_coordinates() == 7).all()
+    np.testing.assert_allclose(layer.to_crs(27700).area, hex_gdf.area, rtol=1e-2)
+
+
+def test_create_hex_grid_map_embeds_layer_by_default(hex_gdf):
+    """Test that without geojson_path the features are embedded in the HTML."""
+    html = create_hex_grid_map(hex_gdf).get_root().render()
+    assert '"hex0"' in html
+
+
+def test_create_hex_grid_map_writes_geojson_file(hex_gdf, tmp_path):
+    """Test that geojson_path moves the features out of the HTML into a file."""
+    geojson_path = tmp_path / "hex.geojson"
+    m = create_hex_grid_map(
+        hex_gdf, geojson_path=geojson_path, geojson_url="/app/static/hex.geojson"
+    )
+    html = m.get_root().render()
+
+    features = json.loads(geojson_path.read_text())["features"]
+    assert [f["properties"]["hex_id"] for f in features] == hex_gdf["hex_id"].tolist()
+    assert '"hex0"' not in html
+    assert "/app/static/hex.geojson" in html
+    assert str(geojson_path) not in html
+
+
+@pytest.mark.parametrize("overwrite_geojson", [True, False])
+def test_create_hex_grid_map_reuses_geojson_file(hex_gdf, tmp_path, overwrite_geojson):
+    """Test that overwrite_geojson=False keeps an existing file but still styles."""
+    geojson_path = tmp_path / "hex.geojson"
+    create_hex_grid_map(hex_gdf, geojson_path=geojson_path)
+    os.utime(geojson_path, (0, 0))
+
+    m = create_hex_grid_map(
+        hex_gdf, geojson_path=geojson_path, overwrite_geojson=overwrite_geojson
+    )
+    html = m.get_root().render()
+
+    assert (geojson_path.stat().st_mtime == 0) is not overwrite_geojson
+    (colormap,) = [c for c in m._children.values() if isinstance(c, cm.StepColormap)]
+    assert colormap.index == jenks_breaks(hex_gdf["pipe_count"])
+    assert PALETTES["grey_blue"][-1] in html
+
+
+def test_create_hex_grid_map_draws_on_given_map(hex_gdf, monkeypatch):
+    """Test that the layer and legend go on the given map, without a new one."""
+    m = folium.Map(location=[53.48, -2.24], zoom_start=12)
+
+    def no_new_map(*args, **kwargs):
+        raise AssertionError("create_hex_grid_map built a new folium.Map")
+
+    monkeypatch.setattr(folium, "Map", no_new_map)
+    result = create_hex_grid_map(hex_gdf, m=m)
+
+    assert result is m
+    children = list(m._children.values())
+    assert sum(isinstance(c, folium.GeoJson) for c in children) == 1
+    assert sum(isinstance(c, cm.StepColormap) for c in children) == 1
+
+
+def test_create_hex_grid_map_empty_frame(hex_gdf):
+    """Test that an empty frame gives a map without a hex layer."""
+    m = create_hex_grid_map(hex_gdf.iloc[:0])
+    assert not any(isinstance(c, folium.GeoJson) for c in m._children.values())
+
+
+def test_create_hex_grid_map_rejects_unknown_breaks_method(hex_gdf):
+    """Test that an unknown break method raises rather than falling back to Jenks."""
+    with pytest.raises(ValueError, match="jenks, quantile"):
+        create_hex_grid_map(hex_gdf, breaks_method="fisher")
+
+
+def test_create_hex_grid_map_styles_not_in_geojson(hex_gdf, tmp_path):
+    """Test that per-hex styles reach the map without adding feature properties."""
+    geojson_path = tmp_path / "hex.geojson"
+    html = create_hex_grid_map(hex_gdf, geojson_path=geojson_path).get_root().render()
+
+    features = json.loads(geojson_path.read_text())["features"]
+    assert all(set(f["properties"]) == {"hex_id", "pipe_count"} for f in features)
+    assert PALETTES["grey_blue"][0] in html
+    assert PALETTES["grey_blue"][-1] in html
+
+
+@pytest.mark.parametrize(
+    "hex_ids",
+    [
+        H3_CELLS,
+        pd.Series(H3_CELLS),
+        pa.array(H3_CELLS),
+        pa.chunked_array([H3_CELLS[:1], H3_CELLS[1:]]),
+        [cell.upper() for cell in H3_CELLS],
+        [int(cell, 16) for cell in H3_CELLS],
+    ],
+)
+def test_h3_cell_ids_parses_ids(hex_ids):
+    """Test that string and integer ids from any container become uint64 ids."""
+    cell_ids = _h3_cell_ids(hex_ids)
+    assert cell_ids.dtype == np.uint64
+    assert cell_ids.tolist() == [int(cell, 16) for cell in H3_CELLS]
+
+
+@pytest.mark.parametrize("hex_id", ["hex0", "12345", "", "8a1951b7550ffff0", None, 7])
+def test_h3_cell_ids_rejects_non_h3_ids(hex_id):
+    """Test that ids which are not H3 cells raise a clear error."""
+    with pytest.raises(ValueError, match="hex_id must"):
+        _h3_cell_ids([H3_CELLS[0], hex_id])
+
+
+@pytest.fixture
+def hex_table():
+    """Hex summary shaped Arrow table, with class indices unlike the Jenks ones."""
+    return pa.table(
+        {
+            "hex_id": H3_CELLS,
+            "pipe_count": [1, 5, 20, 50],
+            "class_idx": pa.array([3, 3, 0, 0], type=pa.int8()),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "to_input",
+    [
+        lambda table: table.to_pandas(),
+        lambda table: table,
+        lambda table: table.to_batches()[0],
+    ],
+    ids=["dataframe", "table", "record_batch"],
+)
+def test_create_hex_grid_map_lonboard_inputs(hex_table, to_input):
+    """Test that DataFrames, Arrow tables and record batches give the same layer."""
+    pytest.importorskip("lonboard")
+    m = create_hex_grid_map_lonboard(to_input(hex_table))
+
+    (layer,) = m.layers
+    values = np.asarray(hex_table["pipe_count"], dtype=np.float64)
+    class_idx = _class_indices(values, jenks_breaks(values), 5)
+    expected_colors = _palette_rgb(PALETTES["grey_blue"])[class_idx]
+    assert pa.chunked_array(layer.get_hexagon).to_pylist() == [
+        int(cell, 16) for cell in H3_CELLS
+    ]
+    assert pa.chunked_array(layer.get_fill_color).to_pylist() == (
+        expected_colors.tolist()
+    )
+
+
+def test_create_hex_grid_map_lonboard_class_column(hex_table):
+    """Test that precomputed class indices pick the colours instead of breaks."""
+    pytest.importorskip("lonboard")
+    m = create_hex_grid_map_lonboard(hex_table, class_column="class_idx")
+
+    colors = _palette_rgb(PALETTES["grey_blue"])
+    assert pa.chunked_array(m.layers[0].get_fill_color).to_pylist() == (
+        colors[[3, 3, 0, 0]].tolist()
+    )
+
+
+def test_create_hex_grid_map_lonboard_empty_input(hex_table):
+    """Test that empty input gives a map without layers."""
+    pytest.importorskip("lonboard")
+    assert create_hex_grid_map_lonboard(hex_table.slice(0, 0)).layers == ()
+
+
+def _png_rgba(data_url: str) -> np.ndarray:
+    """Decode the unfiltered RGBA PNG folium writes for image overlays."""
+    png = base64.b64decode(data_url.split(",", 1)[1])
+    offset, idat = 8, b""
+    while offset < len(png):
+        (length,) = struct.unpack("!I", png[offset : offset + 4])
+        tag, data = png[offset + 4 : offset + 8], png[offset + 8 : offset + 8 + length]
+        if tag == b"IHDR":
+            width, height = struct.unpack("!2I", data[:8])
+        elif tag == b"IDAT":
+            idat += data
+        offset += length + 12
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8)
+    return rows.reshape(height, 1 + width * 4)[:, 1:].reshape(height, width, 4)
+
+
+def _image_overlay(m):
+    return next(
+        child
+        for child in m._children.values()
+        if isinstance(child, folium.raster_layers.ImageOverlay)
+    )
+
+
+def test_create_hex_grid_map_datashader_empty_frame(hex_gdf):
+    """Test that an empty frame gives a map without an overlay."""
+    pytest.importorskip("datashader")
+    m = create_hex_grid_map_datashader(hex_gdf.iloc[:0])
+    assert isinstance(m, folium.Map)
+    assert not any(
+        isinstance(child, folium.raster_layers.ImageOverlay)
+        for child in m._children.values()
+    )
+
+
+def test_create_hex_grid_map_datashader_overlay_bounds(hex_gdf):
+    """Test that the raster overlay covers the hexes' WGS84 bounds."""
+    pytest.importorskip("datashader")
+    overlay = _image_overlay(create_hex_grid_map_datashader(hex_gdf))
+
+    min_lon, min_lat, max_lon, max_lat = hex_gdf.to_crs(4326).total_bounds
+    np.testing.assert_allclose(overlay.bounds, [[min_lat, min_lon], [max_lat, max_lon]])
+
+
+def test_create_hex_grid_map_datashader_north_is_up(hex_gdf):
+    """Test that the top of the raster shows the northern hexes."""
+    pytest.importorskip("datashader")
+    # Counts grow northwards, so the top rows get the last palette colour
+    northing = hex_gdf.geometry.centroid.y
+    hex_gdf = hex_gdf.assign(pipe_count=(northing > northing.median()) * 99 + 1)
+    overlay = _image_overlay(create_hex_grid_map_datashader(hex_gdf, plot_width=100))
+
+    rgba = _png_rgba(overlay.url)
+    colors = _palette_rgb(PALETTES["grey_blue"])
+    top, bottom = rgba[: len(rgba) // 4], rgba[-len(rgba) // 4 :]
+    assert (top[top[..., 3] > 0][:, :3] == colors[-1]).all()
+    assert (bottom[bottom[..., 3] > 0][:, :3] == colors[0]).all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])